@@ -13,3 +13,4 @@ finally:
 from .pitch_controller import PitchController
 from .torque_controller import TorqueController
 from .combined_controller import CombinedController
+from .controller_bank import ControllerBank
@@ -2,11 +2,89 @@
 
 """
 
+from math import isnan
+
 import numpy as np
-import yaml
 
+from . import pitch_controller as pc
+from . import torque_controller as tc
 from .torque_controller import TorqueController
 from .pitch_controller import PitchController
+from .util import njit, filter_coefficient, load_yaml
+
+
+@njit(cache=True)
+def _combined_step_core(torque_params, torque_state, torque_timestep,
+                        torque_alpha, pitch_params, pitch_state,
+                        pitch_timestep, pitch_alpha, const_power_min_pitch,
+                        shared_corner_freq, time, measured_speed,
+                        measured_pitch):
+    """Numeric core of :meth:`CombinedController.step`.
+
+    The params, state, timestep and alpha (speed filter coefficient for one
+    timestep) arguments are those of the torque and pitch controllers; the
+    state arrays must already be initialised, and are updated in place.
+
+    If ``shared_corner_freq`` is non-zero, the two controllers have the same
+    timestep and speed filter with this corner frequency. As long as their
+    states are in step, the filtered speed is then only calculated once.
+
+    """
+    if (shared_corner_freq > 0 and
+            pitch_state[pc._LAST_TIME] == torque_state[tc._LAST_TIME] and
+            pitch_state[pc._SPEED_FILTERED] ==
+            torque_state[tc._SPEED_FILTERED]):
+        # Check if enough time has elapsed
+        elapsed_time = time - pitch_state[pc._LAST_TIME]
+        if elapsed_time < pitch_timestep:
+            return
+
+        # Update filtered speed
+        alpha = filter_coefficient(elapsed_time, shared_corner_freq,
+                                   pitch_timestep, pitch_alpha)
+        speed_filtered = ((1 - alpha) * measured_speed +
+                          alpha * pitch_state[pc._SPEED_FILTERED])
+
+        pc._pitch_update(pitch_params, pitch_state, time, elapsed_time,
+                         speed_filtered, measured_pitch)
+        force_constant_power = (pitch_state[pc._PITCH_DEMAND] >=
+                                const_power_min_pitch)
+        tc._torque_update(torque_params, torque_state, time, elapsed_time,
+                          speed_filtered, force_constant_power)
+    else:
+        pc._pitch_step_core(pitch_params, pitch_state, pitch_timestep,
+                            pitch_alpha, time, measured_speed, measured_pitch)
+        force_constant_power = (pitch_state[pc._PITCH_DEMAND] >=
+                                const_power_min_pitch)
+        tc._torque_step_core(torque_params, torque_state, torque_timestep,
+                             torque_alpha, time, measured_speed,
+                             force_constant_power)
+
+
+@njit(cache=True)
+def _combined_run_core(times, speeds, pitches, torque_params, torque_state,
+                       torque_timestep, torque_alpha, pitch_params,
+                       pitch_state, pitch_timestep, pitch_alpha,
+                       const_power_min_pitch, shared_corner_freq):
+    """Numeric core of :meth:`CombinedController.run_series`.
+
+    Arguments are as for :func:`_combined_step_core`. Returns the torque
+    and pitch demands at each time.
+
+    """
+    N = len(times)
+    torque_demands = np.empty(N)
+    pitch_demands = np.empty(N)
+    for i in range(N):
+        _combined_step_core(torque_params, torque_state, torque_timestep,
+                            torque_alpha, pitch_params, pitch_state,
+                            pitch_timestep, pitch_alpha,
+                            const_power_min_pitch, shared_corner_freq,
+                            times[i], speeds[i], pitches[i])
+        torque_demands[i] = torque_state[tc._TORQUE_DEMAND]
+        pitch_demands[i] = pitch_state[pc._PITCH_DEMAND]
+
+    return torque_demands, pitch_demands
 
 
 class CombinedController:
@@ -23,6 +101,9 @@ class CombinedController:
             the torque controller. Default 0.
 
     """
+    __slots__ = ('const_power_min_pitch', 'c_torque', 'c_pitch',
+                 '_shared_corner_freq')
+
     def __init__(self, torque_params, pitch_params, torque_timestep,
                  pitch_timestep=None, const_power_min_pitch=0):
         if pitch_timestep is None:
@@ -31,6 +112,15 @@ class CombinedController:
         self.c_torque = TorqueController(torque_timestep, torque_params)
         self.c_pitch = PitchController(pitch_timestep, pitch_params)
 
+        # If both controllers run at the same rate with the same speed
+        # filter, the filtered speed only needs calculating once per step
+        corner_freq = self.c_pitch._core_params.corner_freq
+        if (pitch_timestep == torque_timestep and
+                corner_freq == self.c_torque._core_params.corner_freq):
+            self._shared_corner_freq = corner_freq
+        else:
+            self._shared_corner_freq = 0.0
+
     def step(self, time, measured_speed, measured_pitch):
         """Step both controllers forwards in time.
 
@@ -42,10 +132,70 @@ class CombinedController:
             measured_pitch (float): current measured pitch angle
 
         """
-        self.c_pitch.step(time, measured_speed, measured_pitch)
-        force_constant_power = (self.c_pitch.pitch_demand >=
-                                self.const_power_min_pitch)
-        self.c_torque.step(time, measured_speed, force_constant_power)
+        c_torque, c_pitch = self.c_torque, self.c_pitch
+
+        # Check if enough time has elapsed for either controller. This is
+        # False on the first run, when last_time is NaN.
+        if (time - c_pitch._state[pc._LAST_TIME] < c_pitch.timestep and
+                time - c_torque._state[tc._LAST_TIME] < c_torque.timestep):
+            return
+
+        # First run?
+        if isnan(c_pitch._state[pc._LAST_TIME]):
+            c_pitch.initialise(time, measured_speed, measured_pitch)
+        if isnan(c_torque._state[tc._LAST_TIME]):
+            c_torque.initialise(time, measured_speed)
+
+        _combined_step_core(c_torque._core_array, c_torque._state,
+                            c_torque.timestep, c_torque._timestep_alpha,
+                            c_pitch._core_array, c_pitch._state,
+                            c_pitch.timestep, c_pitch._timestep_alpha,
+                            self.const_power_min_pitch,
+                            self._shared_corner_freq,
+                            time, measured_speed, measured_pitch)
+
+    def run_series(self, times, measured_speeds, measured_pitches):
+        """Step both controllers through a whole time series at once.
+
+        This gives the same result as calling :meth:`step` at each time in
+        turn, but runs the loop in compiled code when numba is available.
+        Because the measurements are given up front, it is meant for
+        replaying recorded or prescribed measurements rather than
+        closed-loop simulation.
+
+        Args:
+            times (array): the timestamps
+            measured_speeds (array): measured generator speed at each time
+            measured_pitches (array): measured pitch angle at each time
+
+        Returns:
+            Tuple of arrays ``(torque_demands, pitch_demands)`` giving the
+            demands after each time.
+
+        """
+        times = np.asarray(times, dtype=float)
+        measured_speeds = np.asarray(measured_speeds, dtype=float)
+        measured_pitches = np.asarray(measured_pitches, dtype=float)
+        if not len(times) == len(measured_speeds) == len(measured_pitches):
+            raise ValueError("times, measured_speeds and measured_pitches "
+                             "must have the same length")
+        if len(times) == 0:
+            return np.empty(0), np.empty(0)
+
+        c_torque, c_pitch = self.c_torque, self.c_pitch
+        if c_pitch.last_time is None:
+            c_pitch.initialise(times[0], measured_speeds[0],
+                               measured_pitches[0])
+        if c_torque.last_time is None:
+            c_torque.initialise(times[0], measured_speeds[0])
+
+        return _combined_run_core(times, measured_speeds, measured_pitches,
+                                  c_torque._core_array, c_torque._state,
+                                  c_torque.timestep, c_torque._timestep_alpha,
+                                  c_pitch._core_array, c_pitch._state,
+                                  c_pitch.timestep, c_pitch._timestep_alpha,
+                                  self.const_power_min_pitch,
+                                  self._shared_corner_freq)
 
     @property
     def torque_demand(self):
@@ -60,8 +210,7 @@ class CombinedController:
     @classmethod
     def from_yaml(cls, filename):
         """Read controller params from 'controller' section of YAML file"""
-        with open(filename) as f:
-            config = yaml.safe_load(f)
+        config = load_yaml(filename)
         c = config['controller']
         torque_params = c['torque controller']
         pitch_params = c['pitch controller']
@@ -0,0 +1,128 @@
+"""Bank of combined controllers, for simulating many turbines at once.
+
+"""
+
+from math import isnan
+
+import numpy as np
+
+from . import pitch_controller as pc
+from . import torque_controller as tc
+from .combined_controller import CombinedController, _combined_step_core
+from .util import njit, prange
+
+
+@njit(cache=True, parallel=True)
+def _bank_step_core(torque_params, torque_state, torque_timestep,
+                    torque_alpha, pitch_params, pitch_state, pitch_timestep,
+                    pitch_alpha, const_power_min_pitch, shared_corner_freq,
+                    times, speeds, pitches):
+    """Numeric core of :meth:`ControllerBank.step`.
+
+    Arguments are as for :func:`_combined_step_core`, except that the state
+    arrays have one column per turbine, and the times and measurements are
+    arrays with one value per turbine.
+
+    """
+    for i in prange(len(times)):
+        t_state = torque_state[:, i]
+        p_state = pitch_state[:, i]
+
+        # First run?
+        if isnan(p_state[pc._LAST_TIME]):
+            pc._pitch_initialise(pitch_params, p_state, pitch_timestep,
+                                 times[i], speeds[i], pitches[i])
+        if isnan(t_state[tc._LAST_TIME]):
+            tc._torque_initialise(t_state, torque_timestep,
+                                  times[i], speeds[i])
+
+        _combined_step_core(torque_params, t_state, torque_timestep,
+                            torque_alpha, pitch_params, p_state,
+                            pitch_timestep, pitch_alpha,
+                            const_power_min_pitch, shared_corner_freq,
+                            times[i], speeds[i], pitches[i])
+
+
+class ControllerBank:
+    """A number of identical combined controllers, one for each turbine in a
+    wind farm, which are stepped together.
+
+    The state of all the controllers is kept in arrays with one entry per
+    turbine, and each step runs over the turbines in a single compiled
+    (and, with numba, parallel) loop.
+
+    Args:
+        N (int): number of turbines
+        torque_params (dict): passed to the :class:`TorqueController`
+        pitch_params (dict): passed to the :class:`PitchController`
+        timestep (float): timestep for the torque and pitch controllers
+        const_power_min_pitch (float, optional).
+            The minimum pitch angle to start forcing constant power mode for
+            the torque controller. Default 0.
+
+    """
+    __slots__ = ('N', 'controller', '_torque_state', '_pitch_state')
+
+    def __init__(self, N, torque_params, pitch_params, timestep,
+                 const_power_min_pitch=0):
+        self.N = N
+        # Single controller holding the parameters shared by all turbines
+        self.controller = CombinedController(
+            torque_params, pitch_params, timestep, timestep,
+            const_power_min_pitch)
+        n_torque = len(self.controller.c_torque._state)
+        n_pitch = len(self.controller.c_pitch._state)
+        self._torque_state = np.empty((n_torque, N))
+        self._pitch_state = np.empty((n_pitch, N))
+
+        # Compile the core now rather than in the first step
+        self._step_core(np.zeros((n_torque, 1)), np.zeros((n_pitch, 1)),
+                        np.full(1, timestep), np.zeros(1), np.zeros(1))
+
+        self.reset()
+
+    def reset(self):
+        """Reset the state of all the controllers."""
+        self._torque_state[:] = np.nan
+        self._pitch_state[:] = np.nan
+
+    def step(self, times, measured_speeds, measured_pitches):
+        """Step all the controllers forwards in time.
+
+        Args:
+            times (float or array): the current timestamp, either the same
+                for all turbines or one for each
+            measured_speeds (array): current measured generator speed of
+                each turbine
+            measured_pitches (array): current measured pitch angle of each
+                turbine
+
+        """
+        # Copy the inputs into one array, broadcasting a single time to all
+        # turbines, so the core always gets the same types of argument
+        inputs = np.empty((3, self.N))
+        inputs[0] = times
+        inputs[1] = measured_speeds
+        inputs[2] = measured_pitches
+
+        self._step_core(self._torque_state, self._pitch_state, *inputs)
+
+    def _step_core(self, torque_state, pitch_state, times, measured_speeds,
+                   measured_pitches):
+        c = self.controller
+        _bank_step_core(c.c_torque._core_array, torque_state,
+                        c.c_torque.timestep, c.c_torque._timestep_alpha,
+                        c.c_pitch._core_array, pitch_state,
+                        c.c_pitch.timestep, c.c_pitch._timestep_alpha,
+                        c.const_power_min_pitch, c._shared_corner_freq,
+                        times, measured_speeds, measured_pitches)
+
+    @property
+    def torque_demand(self):
+        """The current torque demand for each turbine."""
+        return self._torque_state[tc._TORQUE_DEMAND].copy()
+
+    @property
+    def pitch_demand(self):
+        """The current pitch demand for each turbine."""
+        return self._pitch_state[pc._PITCH_DEMAND].copy()
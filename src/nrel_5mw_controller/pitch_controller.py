@@ -3,10 +3,148 @@ controller.
 
 """
 
+from collections import namedtuple
+from math import exp, isnan
+
 import numpy as np
-import yaml
 
-from .util import saturate
+from .util import (njit, saturate, filter_coefficient, load_yaml,
+                   StateItem)
+
+# Indices into the pitch controller state array
+_LAST_TIME = 0
+_SPEED_ERROR_INT = 1
+_PITCH_DEMAND = 2
+_SPEED_FILTERED = 3
+
+
+class PitchParams(namedtuple('PitchParams', [
+        'corner_freq', 'rated_speed', 'kp', 'ki', 'doubled_angle',
+        'pitch_min', 'pitch_max', 'rate_limit'])):
+    """Pitch controller parameters, as floats which can be passed directly
+    to compiled code.
+
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, params):
+        """Create from a dict of parameters, as described in
+        :class:`PitchController`."""
+        return cls(
+            corner_freq=float(params['speed filter corner freq']),
+            rated_speed=float(params['rated speed']),
+            kp=float(params['proportional gain']),
+            ki=float(params['integral gain']),
+            doubled_angle=float(params['pitch schedule doubled angle']),
+            pitch_min=float(params['pitch angle min']),
+            pitch_max=float(params['pitch angle max']),
+            rate_limit=float(params['pitch rate limit']))
+
+
+# Indices into the array of PitchParams values passed to the numeric cores
+_P_CORNER_FREQ = PitchParams._fields.index('corner_freq')
+_P_RATED_SPEED = PitchParams._fields.index('rated_speed')
+_P_KP = PitchParams._fields.index('kp')
+_P_KI = PitchParams._fields.index('ki')
+_P_DOUBLED_ANGLE = PitchParams._fields.index('doubled_angle')
+_P_PITCH_MIN = PitchParams._fields.index('pitch_min')
+_P_PITCH_MAX = PitchParams._fields.index('pitch_max')
+_P_RATE_LIMIT = PitchParams._fields.index('rate_limit')
+
+
+@njit(cache=True)
+def _pitch_initialise(params, state, timestep, time, measured_speed,
+                      measured_pitch):
+    """Numeric core of :meth:`PitchController.initialise`."""
+    state[_LAST_TIME] = time - timestep
+    state[_SPEED_FILTERED] = measured_speed
+    state[_PITCH_DEMAND] = measured_pitch
+
+    # Initialise integral speed error. This will ensure that the
+    # pitch angle is unchanged if the initial speed_error is zero
+    GK = 1.0 / (1.0 + measured_pitch / params[_P_DOUBLED_ANGLE])
+    state[_SPEED_ERROR_INT] = measured_pitch / (GK * params[_P_KI])
+
+
+@njit(cache=True)
+def _pitch_step_core(params, state, timestep, timestep_alpha, time,
+                     measured_speed, measured_pitch):
+    """Numeric core of :meth:`PitchController.step`.
+
+    ``params`` is an array of the :class:`PitchParams` values, indexed by
+    the ``_P_*`` constants. ``state`` is the controller state array, which
+    must already be initialised, and is updated in place. ``timestep_alpha``
+    is the speed filter coefficient for one timestep.
+
+    """
+    # Check if enough time has elapsed
+    elapsed_time = time - state[_LAST_TIME]
+    if elapsed_time < timestep:
+        return
+
+    # Update filtered speed
+    alpha = filter_coefficient(elapsed_time, params[_P_CORNER_FREQ],
+                               timestep, timestep_alpha)
+    speed_filtered = ((1 - alpha) * measured_speed +
+                      alpha * state[_SPEED_FILTERED])
+
+    _pitch_update(params, state, time, elapsed_time, speed_filtered,
+                  measured_pitch)
+
+
+@njit(cache=True)
+def _pitch_step_fixed_core(params, state, timestep, timestep_alpha,
+                           measured_speed, measured_pitch):
+    """Numeric core of :meth:`PitchController.step_fixed`."""
+    speed_filtered = ((1 - timestep_alpha) * measured_speed +
+                      timestep_alpha * state[_SPEED_FILTERED])
+    _pitch_update(params, state, state[_LAST_TIME] + timestep, timestep,
+                  speed_filtered, measured_pitch)
+
+
+@njit(cache=True)
+def _pitch_update(params, state, time, elapsed_time, speed_filtered,
+                  measured_pitch):
+    """Update the pitch controller state given the new filtered speed.
+
+    This is the part of :func:`_pitch_step_core` after the speed filter,
+    so that the filter can be shared with the torque controller.
+
+    """
+    rated_speed = params[_P_RATED_SPEED]
+    kp = params[_P_KP]
+    ki = params[_P_KI]
+    pitch_min = params[_P_PITCH_MIN]
+    pitch_max = params[_P_PITCH_MAX]
+
+    # Compute the current speed error and its integral
+    # w.r.t. time; saturate the integral term using the pitch
+    # angle limits:
+    GK = 1.0 / (1.0 + state[_PITCH_DEMAND] / params[_P_DOUBLED_ANGLE])
+    speed_error = speed_filtered - rated_speed
+    speed_error_int = state[_SPEED_ERROR_INT] + speed_error * elapsed_time
+    demand_i = GK * ki * speed_error_int
+    if demand_i < pitch_min:
+        speed_error_int = pitch_min / (GK * ki)
+        demand_i = pitch_min
+    elif demand_i > pitch_max:
+        speed_error_int = pitch_max / (GK * ki)
+        demand_i = pitch_max
+
+    # Superimpose the proportional and integral pitch commands; saturate
+    # the overall command using the pitch angle limits:
+    demand = saturate(GK * kp * speed_error + demand_i, pitch_min, pitch_max)
+
+    # Saturate the overall commanded pitch using the pitch rate limit:
+    max_change = params[_P_RATE_LIMIT] * elapsed_time
+    pitch_demand = measured_pitch + saturate(demand - measured_pitch,
+                                             -max_change, +max_change)
+
+    state[_LAST_TIME] = time
+    state[_SPEED_ERROR_INT] = speed_error_int
+    state[_PITCH_DEMAND] = pitch_demand
+    state[_SPEED_FILTERED] = speed_filtered
 
 
 class PitchController:
@@ -25,22 +163,43 @@ class PitchController:
     * ``speed filter corner freq``: The frequency of the generator speed filter.
 
     """
+
+    __slots__ = ('params', 'timestep', '_state', '_core_params',
+                 '_core_array', '_timestep_alpha')
+
+    # Values from the previous timestep, stored in the state array
+    last_time = StateItem(_LAST_TIME)
+    speed_error_int = StateItem(_SPEED_ERROR_INT)
+    pitch_demand = StateItem(_PITCH_DEMAND)
+    speed_filtered = StateItem(_SPEED_FILTERED)
+
     def __init__(self, timestep, params):
         self.params = params
         self.timestep = timestep
+        self._state = np.empty(4)
+
+        # Parameters for the numeric cores (see util)
+        self._core_params = PitchParams.from_dict(params)
+        self._core_array = np.array(self._core_params)
+
+        # Speed filter coefficient for a step of exactly one timestep
+        self._timestep_alpha = exp(-timestep * self._core_params.corner_freq)
+
+        # Compile the cores now rather than in the first timestep
+        _pitch_step_core(self._core_array, np.zeros(4), timestep,
+                         self._timestep_alpha, timestep, 0.0, 0.0)
+        _pitch_step_fixed_core(self._core_array, np.zeros(4), timestep,
+                               self._timestep_alpha, 0.0, 0.0)
+
         self.reset()
 
     def reset(self):
         """Reset the controller state."""
-        # Values from the previous timestep
-        self.last_time = None
-        self.speed_error_int = None
-        self.pitch_demand = None
-        self.speed_filtered = None
+        self._state[:] = np.nan
 
     def get_scheduled_gain(self, pitch):
         """Calculate the gain schedule factor."""
-        GK = 1.0 / (1.0 + pitch / self.params['pitch schedule doubled angle'])
+        GK = 1.0 / (1.0 + pitch / self._core_params.doubled_angle)
         return GK
 
     def initialise(self, time, measured_speed, measured_pitch):
@@ -52,27 +211,20 @@ class PitchController:
             measured_pitch (float): current measured pitch angle
 
         """
-        self.last_time = time - self.timestep
-        self.speed_filtered = measured_speed
-        self.pitch_demand = measured_pitch
-
-        # Initialise integral speed error. This will ensure that the
-        # pitch angle is unchanged if the initial speed_error is zero
-        GK = self.get_scheduled_gain(measured_pitch)
-        self.speed_error_int = (measured_pitch /
-                                (GK * self.params['integral gain']))
+        _pitch_initialise(self._core_array, self._state, self.timestep,
+                          time, measured_speed, measured_pitch)
 
     def get_pitch_demand(self, speed_error, speed_error_int, GK):
         # Compute the pitch commands associated with the proportional
         # and integral gains:
-        demand_p = GK * self.params['proportional gain'] * speed_error
-        demand_i = GK * self.params['integral gain'] * speed_error_int
+        p = self._core_params
+        demand_p = GK * p.kp * speed_error
+        demand_i = GK * p.ki * speed_error_int
 
         # Superimpose the individual commands to get the total pitch command;
         # saturate the overall command using the pitch angle limits:
         demand = saturate(demand_p + demand_i,
-                          self.params['pitch angle min'],
-                          self.params['pitch angle max'])
+                          p.pitch_min, p.pitch_max)
 
         return demand
 
@@ -88,43 +240,42 @@ class PitchController:
 
         """
 
+        # Check if enough time has elapsed. This is False on the first
+        # run, when last_time is NaN.
+        if time - self._state[_LAST_TIME] < self.timestep:
+            return
+
         # First run?
-        if self.last_time is None:
+        if isnan(self._state[_LAST_TIME]):
             self.initialise(time, measured_speed, measured_pitch)
 
-        # Check if enough time has elapsed
-        elapsed_time = time - self.last_time
-        if elapsed_time < self.timestep:
-            return
+        _pitch_step_core(self._core_array, self._state, self.timestep,
+                         self._timestep_alpha, time, measured_speed,
+                         measured_pitch)
+
+    def step_fixed(self, measured_speed, measured_pitch):
+        """Step the controller forwards by exactly one timestep.
 
-        # Update filtered speed
-        alpha = np.exp(-elapsed_time * self.params['speed filter corner freq'])
-        self.speed_filtered = ((1 - alpha) * measured_speed +
-                               alpha * self.speed_filtered)
-
-        # Compute the current speed error and its integral
-        # w.r.t. time; saturate the integral term using the pitch
-        # angle limits:
-        GK = self.get_scheduled_gain(self.pitch_demand)
-        speed_error = self.speed_filtered - self.params['rated speed']
-        self.speed_error_int += (speed_error * elapsed_time)
-        self.speed_error_int = saturate(
-            self.speed_error_int,
-            self.params['pitch angle min'] / (GK*self.params['integral gain']),
-            self.params['pitch angle max'] / (GK*self.params['integral gain']))
-
-        # Saturate the overall commanded pitch using the pitch rate limit:
-        demand = self.get_pitch_demand(speed_error, self.speed_error_int, GK)
-        pitch_rate = saturate((demand - measured_pitch) / elapsed_time,
-                              -self.params['pitch rate limit'],
-                              +self.params['pitch rate limit'])
-        self.pitch_demand = measured_pitch + pitch_rate * elapsed_time
-        self.last_time = time
+        This is equivalent to calling :meth:`step` with ``time`` equal to
+        ``last_time + timestep``, but skips the elapsed time check and
+        recalculating the speed filter coefficient. The controller must
+        already have been started by a call to :meth:`step`.
+
+        Args:
+            measured_speed (float): current measured generator speed
+            measured_pitch (float): current measured pitch angle
+
+        """
+        if isnan(self._state[_LAST_TIME]):
+            raise RuntimeError("Controller must be started with step() "
+                               "before calling step_fixed()")
+        _pitch_step_fixed_core(self._core_array, self._state, self.timestep,
+                               self._timestep_alpha, measured_speed,
+                               measured_pitch)
 
     @classmethod
     def from_yaml(cls, filename):
         """Read controller params from 'controller' section of YAML file"""
-        with open(filename) as f:
-            config = yaml.safe_load(f)
+        config = load_yaml(filename)
         c = config['controller']
         return cls(c['timestep'], c['pitch controller'])
@@ -2,10 +2,196 @@
 
 """
 
+from collections import namedtuple
+from math import exp, isnan, sqrt
+
 import numpy as np
-import yaml
 
-from .util import saturate
+from .util import (njit, saturate, filter_coefficient, load_yaml,
+                   StateItem)
+
+# Indices into the torque controller state array
+_LAST_TIME = 0
+_TORQUE_DEMAND = 1
+_SPEED_FILTERED = 2
+
+
+class TorqueParams(namedtuple('TorqueParams', [
+        'corner_freq', 'rate_limit', 'cut_in_speed', 'opt_min_speed',
+        'opt_max_speed', 'rated_speed', 'rated_power', 'opt_constant',
+        'torque_max', 'constant_torque', 'ramp1_slope', 'ramp25_slope',
+        'ramp25_start'])):
+    """Torque controller parameters, as floats which can be passed directly
+    to compiled code.
+
+    ``constant_torque`` is zero to control for constant power above rated.
+    ``ramp1_slope``, ``ramp25_slope`` and ``ramp25_start`` describe the
+    linear ramps in regions 1.5 and 2.5.
+
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_dict(cls, params, opt_max_speed):
+        """Create from a dict of parameters, as described in
+        :class:`TorqueController`, and the maximum speed for optimal control
+        which it derives from them."""
+        cut_in_speed = float(params['cut in speed'])
+        opt_min_speed = float(params['opt min speed'])
+        opt_max_speed = float(opt_max_speed)
+        rated_speed = float(params['rated speed'])
+        rated_power = float(params['rated power'])
+        opt_constant = float(params['opt constant'])
+
+        # Linear ramps from cut-in to the optimal region (region 1.5), and
+        # from the optimal region to rated torque (region 2.5)
+        Qrated = rated_power / rated_speed
+        ramp1_slope = (opt_constant * opt_min_speed**2 /
+                       (opt_min_speed - cut_in_speed))
+        ramp25_start = opt_constant * opt_max_speed**2
+        ramp25_slope = ((Qrated - ramp25_start) /
+                        (rated_speed - opt_max_speed))
+
+        return cls(
+            corner_freq=float(params['speed filter corner freq']),
+            rate_limit=float(params['torque rate limit']),
+            cut_in_speed=cut_in_speed,
+            opt_min_speed=opt_min_speed,
+            opt_max_speed=opt_max_speed,
+            rated_speed=rated_speed,
+            rated_power=rated_power,
+            opt_constant=opt_constant,
+            torque_max=float(params['torque max']),
+            constant_torque=float(params.get('constant torque') or 0),
+            ramp1_slope=ramp1_slope,
+            ramp25_slope=ramp25_slope,
+            ramp25_start=ramp25_start)
+
+
+# Indices into the array of TorqueParams values passed to the numeric cores
+_P_CORNER_FREQ = TorqueParams._fields.index('corner_freq')
+_P_RATE_LIMIT = TorqueParams._fields.index('rate_limit')
+_P_CUT_IN_SPEED = TorqueParams._fields.index('cut_in_speed')
+_P_OPT_MIN_SPEED = TorqueParams._fields.index('opt_min_speed')
+_P_OPT_MAX_SPEED = TorqueParams._fields.index('opt_max_speed')
+_P_RATED_SPEED = TorqueParams._fields.index('rated_speed')
+_P_RATED_POWER = TorqueParams._fields.index('rated_power')
+_P_OPT_CONSTANT = TorqueParams._fields.index('opt_constant')
+_P_TORQUE_MAX = TorqueParams._fields.index('torque_max')
+_P_CONSTANT_TORQUE = TorqueParams._fields.index('constant_torque')
+_P_RAMP1_SLOPE = TorqueParams._fields.index('ramp1_slope')
+_P_RAMP25_SLOPE = TorqueParams._fields.index('ramp25_slope')
+_P_RAMP25_START = TorqueParams._fields.index('ramp25_start')
+
+
+@njit(cache=True)
+def _torque_curve(params, spd, const_power):
+    """Numeric core of :meth:`TorqueController.get_torque`.
+
+    ``params`` is an array of the :class:`TorqueParams` values, indexed by
+    the ``_P_*`` constants.
+
+    """
+    cut_in_speed = params[_P_CUT_IN_SPEED]
+    opt_min_speed = params[_P_OPT_MIN_SPEED]
+    opt_max_speed = params[_P_OPT_MAX_SPEED]
+    rated_speed = params[_P_RATED_SPEED]
+    rated_power = params[_P_RATED_POWER]
+    opt_constant = params[_P_OPT_CONSTANT]
+    torque_max = params[_P_TORQUE_MAX]
+    constant_torque = params[_P_CONSTANT_TORQUE]
+    ramp1_slope = params[_P_RAMP1_SLOPE]
+    ramp25_slope = params[_P_RAMP25_SLOPE]
+    ramp25_start = params[_P_RAMP25_START]
+
+    if spd >= rated_speed or const_power:
+        # Region 3 - constant power
+        if spd <= 0:
+            # Needed for harmonic linearisation
+            torque = torque_max
+        elif constant_torque > 0:
+            torque = constant_torque
+        else:
+            torque = rated_power / spd
+    elif spd < opt_min_speed:
+        # Region 1 to 1.5 - linear ramp from cut-in to optimal region
+        torque = ramp1_slope * (spd - cut_in_speed)
+    elif spd < opt_max_speed:
+        # Region 2 - optimal control
+        torque = opt_constant * spd**2
+    else:
+        # Region 2.5 - linear ramp
+        torque = ramp25_start + ramp25_slope * (spd - opt_max_speed)
+
+    # Limit to maximum torque
+    return saturate(torque, 0, torque_max)
+
+
+@njit(cache=True)
+def _torque_initialise(state, timestep, time, measured_speed):
+    """Numeric core of :meth:`TorqueController.initialise`."""
+    state[_LAST_TIME] = time - timestep
+    state[_SPEED_FILTERED] = measured_speed
+
+
+@njit(cache=True)
+def _torque_step_core(params, state, timestep, timestep_alpha, time,
+                      measured_speed, force_constant_power):
+    """Numeric core of :meth:`TorqueController.step`.
+
+    ``params`` is an array of the :class:`TorqueParams` values, indexed by
+    the ``_P_*`` constants. ``state`` is the controller state array, which
+    must already be initialised, and is updated in place. ``timestep_alpha``
+    is the speed filter coefficient for one timestep.
+
+    """
+    # Check if enough time has elapsed
+    elapsed_time = time - state[_LAST_TIME]
+    if elapsed_time < timestep:
+        return
+
+    # Update filtered speed
+    alpha = filter_coefficient(elapsed_time, params[_P_CORNER_FREQ],
+                               timestep, timestep_alpha)
+    speed_filtered = ((1 - alpha) * measured_speed +
+                      alpha * state[_SPEED_FILTERED])
+
+    _torque_update(params, state, time, elapsed_time, speed_filtered,
+                   force_constant_power)
+
+
+@njit(cache=True)
+def _torque_step_fixed_core(params, state, timestep, timestep_alpha,
+                            measured_speed, force_constant_power):
+    """Numeric core of :meth:`TorqueController.step_fixed`."""
+    speed_filtered = ((1 - timestep_alpha) * measured_speed +
+                      timestep_alpha * state[_SPEED_FILTERED])
+    _torque_update(params, state, state[_LAST_TIME] + timestep, timestep,
+                   speed_filtered, force_constant_power)
+
+
+@njit(cache=True)
+def _torque_update(params, state, time, elapsed_time, speed_filtered,
+                   force_constant_power):
+    """Update the torque controller state given the new filtered speed.
+
+    This is the part of :func:`_torque_step_core` after the speed filter,
+    so that the filter can be shared with the pitch controller.
+
+    """
+    # Choose the desired torque & limit
+    torque = _torque_curve(params, speed_filtered, force_constant_power)
+
+    # Saturate the commanded torque using the rate limit
+    torque_demand = state[_TORQUE_DEMAND]
+    if not isnan(torque_demand):
+        max_change = params[_P_RATE_LIMIT] * elapsed_time
+        torque = torque_demand + saturate(torque - torque_demand,
+                                          -max_change, +max_change)
+
+    state[_LAST_TIME] = time
+    state[_TORQUE_DEMAND] = torque
+    state[_SPEED_FILTERED] = speed_filtered
 
 
 class TorqueController:
@@ -40,17 +226,27 @@ class TorqueController:
 
     """
 
+    __slots__ = ('params', 'timestep', 'constant_torque', '_state',
+                 '_opt_max_speed', '_core_params', '_core_array',
+                 '_timestep_alpha')
+
+    # Values from the previous timestep, stored in the state array
+    last_time = StateItem(_LAST_TIME)
+    torque_demand = StateItem(_TORQUE_DEMAND)
+    speed_filtered = StateItem(_SPEED_FILTERED)
+
     def __init__(self, timestep, params):
         self.params = params
         self.timestep = timestep
+        self._state = np.empty(3)
 
         # Calculate maximum optimum-torque speed to achieve slope
         Qrated = self.params['rated power'] / params['rated speed']
         sync_speed = params['rated speed'] / (1 + params['slip percent']/100)
         slope25 = Qrated / (self.params['rated speed'] - sync_speed)
         kopt = params['opt constant']
-        params['opt max speed'] = (
-            (slope25 - np.sqrt(slope25*(slope25 - 4*kopt*sync_speed))) /
+        self._opt_max_speed = (
+            (slope25 - sqrt(slope25*(slope25 - 4*kopt*sync_speed))) /
             (2 * kopt))
 
         # For Hywind: optionally use constant torque instead of constant power
@@ -65,54 +261,76 @@ class TorqueController:
         assert params['torque rate limit'] > 0
         assert (0 < params['cut in speed']
                   < params['opt min speed']
-                  < params['opt max speed']
+                  < self._opt_max_speed
                   < params['rated speed'])
         assert (0 < (kopt * params['rated speed']**2)
                   < Qrated
                   < params['torque max'])
 
+        # Parameters for the numeric cores (see util)
+        self._core_params = p = TorqueParams.from_dict(params,
+                                                       self._opt_max_speed)
+        self._core_array = np.array(p)
+
+        # Speed filter coefficient for a step of exactly one timestep
+        self._timestep_alpha = exp(-timestep * p.corner_freq)
+
+        # Compile the cores now rather than in the first timestep
+        _torque_step_core(self._core_array, np.zeros(3), timestep,
+                          self._timestep_alpha, timestep, 0.0, False)
+        _torque_step_fixed_core(self._core_array, np.zeros(3), timestep,
+                                self._timestep_alpha, 0.0, False)
+
         self.reset()
 
     def reset(self):
         """Reset the controller state."""
-        # Values from the previous timestep
-        self.last_time = None
-        self.torque_demand = None
-        self.speed_filtered = None
-
-    def _optQ(self, speed):
-        return self.params['opt constant'] * speed**2
+        self._state[:] = np.nan
 
     def get_torque(self, spd, const_power):
-        Vin = self.params['cut in speed']
-        Vo1 = self.params['opt min speed']
-        Vo2 = self.params['opt max speed']
-        Vrated = self.params['rated speed']
-        Qrated = self.params['rated power'] / Vrated
-
-        if spd >= Vrated or const_power:
-            # Region 3 - constant power
-            if spd <= 0:
-                # Needed for harmonic linearisation
-                torque = self.params['torque max']
-            elif self.constant_torque is not None:
-                torque = self.constant_torque
+        return _torque_curve(self._core_array, spd, const_power)
+
+    def get_torque_array(self, spds, const_power=False):
+        """Vectorised version of :meth:`get_torque` for arrays of speeds.
+
+        Args:
+            spds (array): generator speeds
+            const_power (bool or array, optional): force constant power mode?
+                Either a single flag, or one for each speed. Default False.
+
+        """
+        p = self._core_params
+        spds = np.asarray(spds, dtype=float)
+
+        def region3(s):
+            if p.constant_torque > 0:
+                torque = np.full_like(s, p.constant_torque)
             else:
-                torque = self.params['rated power'] / spd
-        elif spd < Vo1:
-            # Region 1 to 1.5 - linear ramp from cut-in to optimal region
-            torque = np.interp(spd, [Vin, Vo1], [0, self._optQ(Vo1)])
-        elif spd < Vo2:
-            # Region 2 - optimal control
-            torque = self._optQ(spd)
-        else:
-            # Region 2.5 - linear ramp
-            torque = np.interp(spd, [Vo2, Vrated], [self._optQ(Vo2), Qrated])
+                with np.errstate(divide='ignore'):
+                    torque = p.rated_power / s
+            return np.where(s <= 0, p.torque_max, torque)
 
-        # Limit to maximum torque
-        torque = saturate(torque, 0, self.params['torque max'])
+        def region15(s):
+            return p.ramp1_slope * (s - p.cut_in_speed)
 
-        return torque
+        def region2(s):
+            return p.opt_constant * s**2
+
+        def region25(s):
+            return p.ramp25_start + p.ramp25_slope * (s - p.opt_max_speed)
+
+        # Each function is only evaluated for the speeds in its own region;
+        # anything not in the other regions is in region 2.5
+        in_region3 = (spds >= p.rated_speed) | const_power
+        below_opt = ~in_region3 & (spds < p.opt_max_speed)
+        torque = np.piecewise(spds, [
+            in_region3,
+            below_opt & (spds < p.opt_min_speed),
+            below_opt & (spds >= p.opt_min_speed),
+        ], [region3, region15, region2, region25])
+
+        # Limit to maximum torque
+        return np.clip(torque, 0, p.torque_max, out=torque)
 
     def initialise(self, time, measured_speed):
         """Initialise the controller.
@@ -122,9 +340,7 @@ class TorqueController:
             measured_speed (float): current measured generator speed
 
         """
-
-        self.last_time = time - self.timestep
-        self.speed_filtered = measured_speed
+        _torque_initialise(self._state, self.timestep, time, measured_speed)
 
     def step(self, time, measured_speed, force_constant_power):
         """Step the controller forwards to the next timestep.
@@ -137,37 +353,42 @@ class TorqueController:
             force_constant_power (bool): force constant power mode?
 
         """
+        # Check if enough time has elapsed. This is False on the first
+        # run, when last_time is NaN.
+        if time - self._state[_LAST_TIME] < self.timestep:
+            return
+
         # First run?
-        if self.last_time is None:
+        if isnan(self._state[_LAST_TIME]):
             self.initialise(time, measured_speed)
 
-        # Check if enough time has elapsed
-        elapsed_time = time - self.last_time
-        if elapsed_time < self.timestep:
-            return
+        _torque_step_core(self._core_array, self._state, self.timestep,
+                          self._timestep_alpha, time, measured_speed,
+                          force_constant_power)
 
-        # Update filtered speed
-        alpha = np.exp(-elapsed_time * self.params['speed filter corner freq'])
-        self.speed_filtered = ((1 - alpha) * measured_speed +
-                               alpha * self.speed_filtered)
+    def step_fixed(self, measured_speed, force_constant_power):
+        """Step the controller forwards by exactly one timestep.
 
-        # Choose the desired torque & limit
-        torque = self.get_torque(self.speed_filtered, force_constant_power)
+        This is equivalent to calling :meth:`step` with ``time`` equal to
+        ``last_time + timestep``, but skips the elapsed time check and
+        recalculating the speed filter coefficient. The controller must
+        already have been started by a call to :meth:`step`.
 
-        # Saturate the commanded torque using the rate limit
-        if self.torque_demand is not None:
-            rate = saturate((torque - self.torque_demand) / elapsed_time,
-                            -self.params['torque rate limit'],
-                            +self.params['torque rate limit'])
-            torque = self.torque_demand + rate * elapsed_time
+        Args:
+            measured_speed (float): current measured generator speed
+            force_constant_power (bool): force constant power mode?
 
-        self.torque_demand = torque
-        self.last_time = time
+        """
+        if isnan(self._state[_LAST_TIME]):
+            raise RuntimeError("Controller must be started with step() "
+                               "before calling step_fixed()")
+        _torque_step_fixed_core(self._core_array, self._state, self.timestep,
+                                self._timestep_alpha, measured_speed,
+                                force_constant_power)
 
     @classmethod
     def from_yaml(cls, filename):
         """Read controller params from 'controller' section of YAML file"""
-        with open(filename) as f:
-            config = yaml.safe_load(f)
+        config = load_yaml(filename)
         c = config['controller']
         return cls(c['timestep'], c['torque controller'])
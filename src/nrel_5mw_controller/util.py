@@ -1,6 +1,91 @@
 """Utility functions."""
 
+import copy
+import functools
+import os
+from math import exp, isnan, nan
 
+import yaml
+
+# The numeric cores of the controllers are compiled with numba. They take
+# the controller parameters as a float array, indexed by constants derived
+# from the fields of the PitchParams/TorqueParams namedtuples: numba types an
+# array argument much faster than a namedtuple, which matters when step() is
+# called from Python every timestep. The controllers call their cores once
+# with dummy values when they are created, so that compilation happens then
+# rather than in the first timestep.
+try:
+    from numba import njit, prange
+except ImportError:
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Stand-in for ``numba.njit`` when numba cannot be imported.
+
+        The decorated function is returned unchanged, so it runs as plain
+        Python. This keeps the controllers usable (and testable) without
+        numba, but the array-based cores are slower as plain Python than
+        the original implementation, which is why numba is a requirement.
+        """
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, inline='always')
 def saturate(x, a, b):
+    """Limit `x` to the range [`a`, `b`]."""
     return min(max(x, a), b)
 
+
+@njit(cache=True, inline='always')
+def filter_coefficient(elapsed_time, corner_freq, timestep, timestep_alpha):
+    """Coefficient of the first-order speed filter over `elapsed_time`.
+
+    `timestep_alpha` is the precomputed coefficient for exactly `timestep`,
+    which is used instead of calling exp() whenever `elapsed_time` is equal
+    to `timestep` to within rounding error.
+    """
+    if abs(elapsed_time - timestep) < 1e-12:
+        return timestep_alpha
+    return exp(-elapsed_time * corner_freq)
+
+
+class StateItem:
+    """Attribute giving access to one element of an object's ``_state``
+    array.
+
+    NaN in the array stands for ``None``, i.e. a value which has not been set
+    yet.
+    """
+
+    def __init__(self, index, doc=None):
+        self.index = index
+        self.__doc__ = doc
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        value = obj._state[self.index]
+        return None if isnan(value) else float(value)
+
+    def __set__(self, obj, value):
+        obj._state[self.index] = nan if value is None else value
+
+
+@functools.lru_cache(maxsize=32)
+def _load_yaml_cached(filename, mtime):
+    with open(filename) as f:
+        return yaml.safe_load(f)
+
+
+def load_yaml(filename):
+    """Load a YAML file.
+
+    The parsed contents are cached until the file is modified, so repeatedly
+    loading the same file is cheap. A new copy is returned each time, so it
+    is safe to modify.
+    """
+    filename = os.path.abspath(filename)
+    config = _load_yaml_cached(filename, os.path.getmtime(filename))
+    return copy.deepcopy(config)
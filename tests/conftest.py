@@ -1,11 +1,56 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 """
-    Dummy conftest.py for nrel_5mw_controller.
-
-    If you don't know what this is for, just leave it empty.
-    Read more about conftest.py under:
-    https://pytest.org/latest/plugins.html
+    Shared fixtures for the nrel_5mw_controller tests.
 """
 
-# import pytest
+import importlib
+import sys
+
+import pytest
+
+
+@pytest.fixture
+def torque_params():
+    """Torque controller parameters for the NREL 5MW turbine."""
+    return {
+        'rated speed': 122.9096,
+        'rated power': 5296610.0,
+        'slip percent': 10.0,
+        'opt constant': 2.332287,
+        'speed filter corner freq': 1.570796,
+        'cut in speed': 70.16224,
+        'opt min speed': 91.21091,
+        'torque max': 47402.91,
+        'torque rate limit': 15000.0,
+    }
+
+
+@pytest.fixture
+def pitch_params():
+    """Pitch controller parameters for the NREL 5MW turbine."""
+    return {
+        'proportional gain': 0.01882681,
+        'integral gain': 0.008068634,
+        'pitch schedule doubled angle': 0.1099965,
+        'pitch angle min': 0.0,
+        'pitch angle max': 1.570796,
+        'pitch rate limit': 0.1396263,
+        'rated speed': 122.9096,
+        'speed filter corner freq': 1.570796,
+    }
+
+
+@pytest.fixture(params=['numba', 'python'])
+def controller_package(request, monkeypatch):
+    """The nrel_5mw_controller package, compiled with numba and imported
+    again as plain Python with numba hidden."""
+    if request.param == 'numba':
+        pytest.importorskip('numba')
+        return importlib.import_module('nrel_5mw_controller')
+
+    monkeypatch.setitem(sys.modules, 'numba', None)
+    for name in list(sys.modules):
+        if name.split('.')[0] == 'nrel_5mw_controller':
+            monkeypatch.delitem(sys.modules, name)
+    return importlib.import_module('nrel_5mw_controller')
@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+
+import numpy as np
+import pytest
+
+from nrel_5mw_controller import (CombinedController, PitchController,
+                                 TorqueController)
+
+REFERENCE_FILE = os.path.join(os.path.dirname(__file__), 'data',
+                              'combined_reference.csv')
+
+
+def synthetic_trace():
+    """Measured speed and pitch sweeping through all the control regions."""
+    times = np.arange(1600) * 0.0125
+    speeds = (100 + 40 * np.sin(2 * np.pi * times / 20) +
+              2 * np.sin(2 * np.pi * 1.3 * times))
+    pitches = np.maximum(0, 0.1 * np.sin(2 * np.pi * times / 20) +
+                         0.005 * np.sin(2 * np.pi * 0.7 * times))
+    return times, speeds, pitches
+
+
+def test_step_matches_reference(controller_package, torque_params,
+                                pitch_params):
+    c = controller_package.CombinedController(
+        torque_params, pitch_params, 0.0125, const_power_min_pitch=0.01745)
+    demands = []
+    for time, speed, pitch in zip(*synthetic_trace()):
+        c.step(time, speed, pitch)
+        demands.append((time, c.torque_demand, c.pitch_demand))
+
+    reference = np.loadtxt(REFERENCE_FILE, delimiter=',')
+    np.testing.assert_allclose(np.array(demands)[::4], reference,
+                               rtol=1e-9, atol=1e-9)
+
+
+def test_run_series_matches_step(torque_params, pitch_params):
+    c_step = CombinedController(torque_params, pitch_params, 0.0125,
+                                const_power_min_pitch=0.01745)
+    c_series = CombinedController(torque_params, pitch_params, 0.0125,
+                                  const_power_min_pitch=0.01745)
+    times, speeds, pitches = synthetic_trace()
+
+    expected = []
+    for time, speed, pitch in zip(times, speeds, pitches):
+        c_step.step(time, speed, pitch)
+        expected.append((c_step.torque_demand, c_step.pitch_demand))
+    torque_demands, pitch_demands = c_series.run_series(times, speeds,
+                                                        pitches)
+
+    np.testing.assert_array_equal(torque_demands, [t for t, p in expected])
+    np.testing.assert_array_equal(pitch_demands, [p for t, p in expected])
+    assert c_series.torque_demand == c_step.torque_demand
+    assert c_series.pitch_demand == c_step.pitch_demand
+
+
+def test_run_series_rejects_mismatched_lengths(torque_params, pitch_params):
+    c = CombinedController(torque_params, pitch_params, 0.0125)
+    with pytest.raises(ValueError):
+        c.run_series(np.arange(10) * 0.0125, np.full(3, 100.0), np.zeros(3))
+    with pytest.raises(ValueError):
+        c.run_series(np.arange(3) * 0.0125, np.full(3, 100.0), np.zeros(4))
+
+
+def run_separately(torque_params, pitch_params, torque_timestep,
+                   pitch_timestep, const_power_min_pitch):
+    """Demands from stepping a pitch and torque controller independently."""
+    c_torque = TorqueController(torque_timestep, torque_params)
+    c_pitch = PitchController(pitch_timestep, pitch_params)
+    demands = []
+    for time, speed, pitch in zip(*synthetic_trace()):
+        c_pitch.step(time, speed, pitch)
+        force_constant_power = (c_pitch.pitch_demand >=
+                                const_power_min_pitch)
+        c_torque.step(time, speed, force_constant_power)
+        demands.append((c_torque.torque_demand, c_pitch.pitch_demand))
+    return demands
+
+
+def run_combined(c):
+    demands = []
+    for time, speed, pitch in zip(*synthetic_trace()):
+        c.step(time, speed, pitch)
+        demands.append((c.torque_demand, c.pitch_demand))
+    return demands
+
+
+def test_shared_speed_filter_matches_separate_controllers(torque_params,
+                                                         pitch_params):
+    c = CombinedController(torque_params, pitch_params, 0.0125,
+                           const_power_min_pitch=0.01745)
+    assert c._shared_corner_freq > 0
+
+    expected = run_separately(torque_params, pitch_params, 0.0125, 0.0125,
+                              0.01745)
+    np.testing.assert_array_equal(run_combined(c), expected)
+
+
+@pytest.mark.parametrize('pitch_timestep, pitch_corner_freq', [
+    (0.025, 1.570796),
+    (0.0125, 2.0),
+])
+def test_separate_speed_filters_match_separate_controllers(
+        torque_params, pitch_params, pitch_timestep, pitch_corner_freq):
+    pitch_params['speed filter corner freq'] = pitch_corner_freq
+    c = CombinedController(torque_params, pitch_params, 0.0125,
+                           pitch_timestep, const_power_min_pitch=0.01745)
+    assert c._shared_corner_freq == 0
+
+    expected = run_separately(torque_params, pitch_params, 0.0125,
+                              pitch_timestep, 0.01745)
+    np.testing.assert_array_equal(run_combined(c), expected)
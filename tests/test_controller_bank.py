@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+
+N_TURBINES = 5
+TIMESTEP = 0.0125
+
+
+def speeds_and_pitches(i):
+    """Different measurements for each turbine at step `i`."""
+    turbines = np.arange(N_TURBINES)
+    speeds = 100 + 30 * np.sin(0.01 * i + turbines)
+    pitches = np.maximum(0, 0.05 * np.sin(0.01 * i + turbines))
+    return speeds, pitches
+
+
+def check_against_combined_controllers(package, torque_params, pitch_params,
+                                       get_times):
+    bank = package.ControllerBank(N_TURBINES, torque_params, pitch_params,
+                                  TIMESTEP, const_power_min_pitch=0.01745)
+    controllers = [
+        package.CombinedController(torque_params, pitch_params, TIMESTEP,
+                                   const_power_min_pitch=0.01745)
+        for _ in range(N_TURBINES)
+    ]
+
+    for i in range(400):
+        times = get_times(i)
+        speeds, pitches = speeds_and_pitches(i)
+        bank.step(times, speeds, pitches)
+        for c, time, speed, pitch in zip(controllers,
+                                         np.broadcast_to(times, N_TURBINES),
+                                         speeds, pitches):
+            c.step(time, speed, pitch)
+
+        np.testing.assert_array_equal(
+            bank.torque_demand, [c.torque_demand for c in controllers])
+        np.testing.assert_array_equal(
+            bank.pitch_demand, [c.pitch_demand for c in controllers])
+
+
+def test_bank_with_same_time(controller_package, torque_params,
+                             pitch_params):
+    check_against_combined_controllers(controller_package, torque_params,
+                                       pitch_params, lambda i: i * TIMESTEP)
+
+
+def test_bank_with_time_for_each_turbine(controller_package, torque_params,
+                                         pitch_params):
+    # Clocks out of phase with each other, some of which only reach the next
+    # controller timestep every few calls
+    offsets = np.array([0.0, 0.003, -0.007, 0.0125, 0.02])
+    rates = np.array([1.0, 0.5, 0.75, 1.5, 2.0])
+    check_against_combined_controllers(
+        controller_package, torque_params, pitch_params,
+        lambda i: offsets + i * TIMESTEP * rates)
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from nrel_5mw_controller import PitchController
+
+# Exactly representable, so that last_time + timestep accumulates exactly
+TIMESTEP = 0.125
+
+
+def test_step_fixed_matches_step(pitch_params):
+    c_fixed = PitchController(TIMESTEP, pitch_params)
+    c_step = PitchController(TIMESTEP, pitch_params)
+    c_fixed.step(0.0, 120.0, 0.05)
+    c_step.step(0.0, 120.0, 0.05)
+
+    for i in range(200):
+        speed = 123 + 5 * np.sin(i / 10)
+        pitch = c_fixed.pitch_demand
+        c_fixed.step_fixed(speed, pitch)
+        c_step.step(c_step.last_time + TIMESTEP, speed, pitch)
+        assert c_fixed.last_time == c_step.last_time
+        assert c_fixed.speed_filtered == c_step.speed_filtered
+        assert c_fixed.speed_error_int == c_step.speed_error_int
+        assert c_fixed.pitch_demand == c_step.pitch_demand
+
+
+def test_step_fixed_before_step_raises(pitch_params):
+    c = PitchController(TIMESTEP, pitch_params)
+    with pytest.raises(RuntimeError):
+        c.step_fixed(120.0, 0.05)
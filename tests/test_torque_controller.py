@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import numpy as np
+import pytest
+
+from nrel_5mw_controller import TorqueController
+
+
+def speeds_across_regions(c):
+    """Speeds from -10 to 200 rad/s, including the region boundaries."""
+    p = c._core_params
+    boundaries = [0.0, p.cut_in_speed, p.opt_min_speed, p.opt_max_speed,
+                  p.rated_speed]
+    return np.concatenate([np.linspace(-10, 200, 2101), boundaries])
+
+
+@pytest.mark.parametrize('const_power', [False, True])
+def test_get_torque_array_matches_get_torque(torque_params, const_power):
+    c = TorqueController(0.0125, torque_params)
+    speeds = speeds_across_regions(c)
+    expected = [c.get_torque(spd, const_power) for spd in speeds]
+    np.testing.assert_array_equal(c.get_torque_array(speeds, const_power),
+                                  expected)
+
+
+def test_get_torque_array_with_const_power_for_each_speed(torque_params):
+    c = TorqueController(0.0125, torque_params)
+    speeds = speeds_across_regions(c)
+    const_power = np.arange(len(speeds)) % 3 == 0
+    expected = [c.get_torque(spd, cp) for spd, cp in zip(speeds, const_power)]
+    np.testing.assert_array_equal(c.get_torque_array(speeds, const_power),
+                                  expected)
+
+
+def test_step_fixed_matches_step(torque_params):
+    # Exactly representable, so that last_time + timestep accumulates exactly
+    timestep = 0.125
+    c_fixed = TorqueController(timestep, torque_params)
+    c_step = TorqueController(timestep, torque_params)
+    c_fixed.step(0.0, 100.0, False)
+    c_step.step(0.0, 100.0, False)
+
+    for i in range(200):
+        speed = 110 + 20 * np.sin(i / 10)
+        force_constant_power = i > 150
+        c_fixed.step_fixed(speed, force_constant_power)
+        c_step.step(c_step.last_time + timestep, speed, force_constant_power)
+        assert c_fixed.last_time == c_step.last_time
+        assert c_fixed.speed_filtered == c_step.speed_filtered
+        assert c_fixed.torque_demand == c_step.torque_demand
+
+
+def test_step_fixed_before_step_raises(torque_params):
+    c = TorqueController(0.0125, torque_params)
+    with pytest.raises(RuntimeError):
+        c.step_fixed(100.0, False)
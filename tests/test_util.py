@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from math import exp
+
+import pytest
+
+from nrel_5mw_controller.util import filter_coefficient, load_yaml
+
+
+@pytest.mark.parametrize('elapsed_time', [
+    0.0125, 0.0125 + 1e-14, 0.0125 - 1e-14, 0.0125 * 3 - 0.0125 * 2,
+])
+def test_filter_coefficient_uses_precomputed_value(elapsed_time):
+    corner_freq = 1.570796
+    alpha = exp(-0.0125 * corner_freq)
+    result = filter_coefficient(elapsed_time, corner_freq, 0.0125, alpha)
+    assert result == alpha
+    assert result == pytest.approx(exp(-elapsed_time * corner_freq),
+                                   rel=1e-12)
+
+
+@pytest.mark.parametrize('elapsed_time', [0.025, 0.0125 + 1e-9, 1.0])
+def test_filter_coefficient_other_elapsed_times(elapsed_time):
+    corner_freq = 1.570796
+    alpha = exp(-0.0125 * corner_freq)
+    result = filter_coefficient(elapsed_time, corner_freq, 0.0125, alpha)
+    assert result == exp(-elapsed_time * corner_freq)
+
+
+def test_load_yaml_returns_separate_copies(tmp_path):
+    filename = tmp_path / 'config.yaml'
+    filename.write_text('controller:\n  timestep: 0.0125\n')
+
+    first = load_yaml(str(filename))
+    first['controller']['timestep'] = 1.0
+    second = load_yaml(str(filename))
+
+    assert second == {'controller': {'timestep': 0.0125}}
+    assert second is not first
+
+
+def test_load_yaml_reloads_modified_file(tmp_path):
+    filename = tmp_path / 'config.yaml'
+    filename.write_text('timestep: 0.0125\n')
+    assert load_yaml(str(filename)) == {'timestep': 0.0125}
+
+    # Move the modification time on explicitly, in case the rewrite happens
+    # within the resolution of the file system's timestamps
+    filename.write_text('timestep: 0.0250\n')
+    mtime = os.path.getmtime(filename)
+    os.utime(filename, (mtime + 10, mtime + 10))
+    assert load_yaml(str(filename)) == {'timestep': 0.025}